@@ -1,10 +1,26 @@
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
-import random
 import time
 import threading
+import queue
 import json
 import os
+import sys
+from functools import lru_cache
+import numpy as np
+
+try:
+    import numba
+    from numba import njit, prange
+    # The TBB layer keeps the process from exiting once a parallel kernel has run on a
+    # worker thread (training does), so prefer OpenMP / workqueue.
+    numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+except ImportError:
+    # Numba is optional: without it the kernels below simply run as plain Python.
+    def njit(*args, **kwargs):
+        if args and callable(args[0]): return args[0]
+        return lambda fn: fn
+    prange = range
 
 # --- Constants ---
 CELL_SIZE = 40
@@ -18,72 +34,272 @@ COLORS = {
     'grid': "#BDC3C7", 'bg': "#ECF0F1", 'panel_bg': "#ffffff"
 }
 
+TRAIN_BATCH_GAMES = 16  # Self-play games per training tick
+MAX_BATCH_MOVES = 4096  # Cap on recorded moves per self-play game
+SNAPSHOT_MS = 500       # How often the board is redrawn while training
+LOG_MAX_LINES = 200     # Older log lines are dropped so long training runs don't grow the log
+Q_DTYPE = np.float16    # Storage type of Q-values; Q-learning tolerates the low precision
+
+NAMES = ("Red", "Green", "Yellow", "Blue")
+COLS = (COLORS['R'], COLORS['G'], COLORS['Y'], COLORS['B'])
+
+# Safe squares (relative to the mover's start) packed into one int: bit n set -> square n is safe
+SAFE_SQUARES_MASK = sum(1 << p for p in (0, 8, 13, 21, 26, 34, 39, 47))
+
+# --- Board Geometry ---
+# Static board data, built once at import and shared by every LudoLogic
+def _generate_path():
+    path = []
+    for c in range(1, 6): path.append((c, 6))
+    for r in range(5, -1, -1): path.append((6, r))
+    path.append((7, 0))
+    for r in range(6): path.append((8, r))
+    for c in range(9, 15): path.append((c, 6))
+    path.append((14, 7))
+    for c in range(14, 8, -1): path.append((c, 8))
+    for r in range(9, 15): path.append((8, r))
+    path.append((7, 14))
+    for r in range(14, 8, -1): path.append((6, r))
+    for c in range(5, -1, -1): path.append((c, 8))
+    path.append((0, 7))
+    for c in range(6): path.append((c, 7)) 
+    return path
+
+# The 52 cells of the shared track, starting from Red's start square
+GLOBAL_PATH = tuple(_generate_path())
+GLOBAL_PATH_XY = np.asarray(GLOBAL_PATH, dtype=np.int8)
+
+# GLOBAL_IDX[player, pos] -> cell on the shared track for pos in [0, 50], i.e. (player*13 + pos) % 52
+GLOBAL_IDX = np.array([[(p * 13 + q) % 52 for q in range(51)] for p in range(4)], dtype=np.int8)
+
+def _build_coord_table():
+    # coord_table[player, piece, pos+1] -> (cx, cy) for every pos in [-1, 57].
+    # Piece index is needed because each piece has its own slot in the base.
+    table = np.empty((4, 4, 59, 2), dtype=np.float32)
+    for p_id in range(4):
+        for piece_idx in range(4):
+            for pos in range(-1, 58):
+                table[p_id, piece_idx, pos + 1] = _compute_coords(p_id, piece_idx, pos)
+    return table
+
+def _compute_coords(player_idx, piece_idx, pos):
+    if pos == -1:
+        base = [(0,0), (9,0), (9,9), (0,9)][player_idx]
+        off = [(1.5,1.5), (3.5,1.5), (1.5,3.5), (3.5,3.5)][piece_idx]
+        return (base[0] + off[0], base[1] + off[1])
+    if pos < 51: return GLOBAL_PATH_XY[GLOBAL_IDX[player_idx, pos]]
+    elif pos < 57: 
+        d = pos - 51
+        if player_idx == 0: return (1 + d, 7)
+        if player_idx == 1: return (7, 1 + d)
+        if player_idx == 2: return (13 - d, 7)
+        if player_idx == 3: return (7, 13 - d)
+    return (7, 7)
+
+COORD_TABLE = _build_coord_table()
+
+# --- Game Step Kernel ---
+# The hot part of a move, compiled with Numba. Works in place on the int8[4,4] board.
+# Returns (new_pos, reward, kills, done) where done means the mover has won.
+@njit(cache=True)
+def step_kernel(pieces, turn, piece_idx, roll):
+    curr = int(pieces[turn, piece_idx])
+    new_pos = 0 if curr == -1 else curr + roll
+    pieces[turn, piece_idx] = new_pos
+    reward = 1.0 + new_pos * 0.1
+    kills = 0
+
+    # Kill Logic
+    if new_pos < 51 and not (SAFE_SQUARES_MASK >> new_pos) & 1:
+        my_glob = GLOBAL_IDX[turn, new_pos]
+        for oid in range(4):
+            if oid == turn: continue
+            for opi in range(4):
+                opos = int(pieces[oid, opi])
+                if opos != -1 and opos < 51 and GLOBAL_IDX[oid, opos] == my_glob:
+                    pieces[oid, opi] = -1
+                    kills += 1
+        reward += 50.0 * kills
+
+    done = False
+    if new_pos == 57:
+        reward += 100.0
+        done = True
+        for i in range(4):
+            if pieces[turn, i] != 57: done = False
+    return new_pos, reward, kills, done
+
+# Same packing as QBrain.get_state_key, usable from inside the kernels
+@njit(cache=True)
+def pack_state(row, roll):
+    return ((int(row[0])+1) << 21) | ((int(row[1])+1) << 15) | ((int(row[2])+1) << 9) | ((int(row[3])+1) << 3) | roll
+
+# --- Parallel Self-Play ---
+# Plays n_games independent games at once (one per core with Numba).
+# Moves are picked uniformly among the valid ones (pure exploration), since the
+# Q-table is a Python dict and can't be read from nopython code.
+# Game g is seeded with seed + g, so a batch is reproducible whatever thread plays it.
+# Returns the final boards plus every (state_key, action, reward) per game;
+# counts[g] tells how many moves of row g are filled in.
+@njit(cache=True, parallel=True)
+def play_batch(n_games, seed):
+    boards = np.full((n_games, 4, 4), -1, dtype=np.int8)
+    keys = np.zeros((n_games, MAX_BATCH_MOVES), dtype=np.int64)
+    actions = np.zeros((n_games, MAX_BATCH_MOVES), dtype=np.int8)
+    rewards = np.zeros((n_games, MAX_BATCH_MOVES), dtype=np.float32)
+    counts = np.zeros(n_games, dtype=np.int64)
+
+    for g in prange(n_games):
+        np.random.seed(seed + g)
+        pieces = boards[g]
+        valid = np.empty(4, dtype=np.int64)
+        turn = 0
+        n = 0
+        done = False
+        while not done and n < MAX_BATCH_MOVES:
+            roll = np.random.randint(1, 7)
+            n_valid = 0
+            for i in range(4):
+                pos = int(pieces[turn, i])
+                if (pos == -1 and roll == 6) or (pos != -1 and pos + roll <= 57):
+                    valid[n_valid] = i
+                    n_valid += 1
+            if n_valid > 0:
+                piece_idx = valid[np.random.randint(0, n_valid)]
+                keys[g, n] = pack_state(pieces[turn], roll)
+                new_pos, reward, kills, done = step_kernel(pieces, turn, piece_idx, roll)
+                actions[g, n] = piece_idx
+                rewards[g, n] = reward
+                n += 1
+            if roll != 6: turn = (turn + 1) % 4
+        counts[g] = n
+    return boards, keys, actions, rewards, counts
+
+# --- Random Draws ---
+# Dice rolls and uniform draws for the GUI's turns are generated in bulk and handed out
+# one at a time, instead of a call into the random module per move. The same generator
+# also seeds each training batch, so one seed makes a whole session reproducible.
+class RandomBuffer:
+    SIZE = 4096
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self._fill_rolls()
+        self._fill_eps()
+
+    def _fill_rolls(self):
+        # tolist() so callers get plain ints (np.int8 would overflow when packing state keys)
+        self._rolls = self.rng.integers(1, 7, size=self.SIZE, dtype=np.int8).tolist()
+        self._roll_idx = 0
+
+    def _fill_eps(self):
+        self._eps = self.rng.random(self.SIZE, dtype=np.float32).tolist()
+        self._eps_idx = 0
+
+    def roll(self):
+        # Dice roll in [1, 6]
+        if self._roll_idx == self.SIZE: self._fill_rolls()
+        r = self._rolls[self._roll_idx]
+        self._roll_idx += 1
+        return r
+
+    def uniform(self):
+        # Float in [0, 1)
+        if self._eps_idx == self.SIZE: self._fill_eps()
+        u = self._eps[self._eps_idx]
+        self._eps_idx += 1
+        return u
+
+    def choice(self, seq):
+        return seq[int(self.uniform() * len(seq))]
+
+    def batch_seed(self):
+        # Base seed for one play_batch call (leaves room for + game index)
+        return int(self.rng.integers(0, 2**31))
+
 # --- Shared Brain (The Q-Table) ---
 # We use one Q-table for all players to speed up learning.
-# State key: "sorted_piece_positions|roll"
+# State key: piece positions + roll bit-packed into a single int
+# Q-values: one contiguous (N, 4) Q_DTYPE array, one row per state and one slot per piece.
+# q_index maps state key -> row; rows are handed out in insertion order.
 class QBrain:
-    def __init__(self):
-        self.q_table = {} 
+    def __init__(self, seed=None):
+        self.q_index = {}
+        self.q_values = np.zeros((1024, 4), dtype=Q_DTYPE) # Grows by doubling
+        self.rng = RandomBuffer(seed) # Also rolls the dice for the GUI and seeds training
         self.alpha = 0.5    # Learning Rate
         self.gamma = 0.9    # Discount Factor
-        self.epsilon = 0.2  # Exploration Rate (Training Mode)
+        self.epsilon = 0.05 # Exploration Rate (Play Mode; training self-play moves are all random)
 
     def get_state_key(self, pieces, roll):
-        # We sort pieces so [0,5] is treated same as [5,0] (reduces state space)
-        # Note: We must track which original index corresponds to which value for actions
-        # But for simple lookup, we just use string representation.
-        # To keep it simple and robust for this demo, we won't sort, 
-        # so specific pieces retain identity (Piece 1 vs Piece 2).
-        p_str = ",".join(map(str, pieces))
-        return f"{p_str}|{roll}"
-
-    def choose_action(self, pieces, roll, valid_moves, training=True):
+        # Pieces are not sorted, so specific pieces retain identity (Piece 1 vs Piece 2).
+        # Each position is in [-1, 57] -> 6 bits after +1, roll is in [1, 6] -> 3 bits.
+        # Int keys hash and compare much faster than formatted strings.
+        # pieces is the player's int8 row of the board; tolist() unboxes all four
+        # positions to Python ints in one call (np.int8 would overflow when shifted).
+        p0, p1, p2, p3 = pieces.tolist()
+        return ((p0+1) << 21) | ((p1+1) << 15) | ((p2+1) << 9) | ((p3+1) << 3) | roll
+
+    def choose_action(self, pieces, roll, valid_moves):
+        # Only used in Play Mode: training moves come from play_batch
         if not valid_moves: return None
         
         state = self.get_state_key(pieces, roll)
         
-        # If Training: Explore sometimes
-        # If Playing (Not training): Always Exploit (epsilon = 0)
-        eff_epsilon = self.epsilon if training else 0.05
-        
-        if random.random() < eff_epsilon:
-            return random.choice(valid_moves)
+        # Mostly exploit, with a little exploration
+        if self.rng.uniform() < self.epsilon:
+            return self.rng.choice(valid_moves)
         
         # Exploitation (Use learned values)
-        if state not in self.q_table:
-            return random.choice(valid_moves) # No knowledge yet
-        
-        # Find move with highest Q-value
-        best_action = valid_moves[0]
-        max_q = -float('inf')
-        
-        for move in valid_moves:
-            # move is the index of the piece (0-3)
-            # Since q_table stores keys as strings, we check retrieval
-            q_val = self.q_table[state].get(str(move), 0.0) # Json keys are strings
-            if q_val > max_q:
-                max_q = q_val
-                best_action = move
-        return best_action
+        row = self.q_index.get(state)
+        if row is None:
+            return self.rng.choice(valid_moves) # No knowledge yet
+        
+        # Find move with highest Q-value (columns are indexed directly by piece index 0-3)
+        return valid_moves[int(np.argmax(self.q_values[row, valid_moves]))]
+
+    def _add_state(self, state):
+        row = len(self.q_index)
+        if row == len(self.q_values):
+            grown = np.zeros((max(2 * row, 1024), 4), dtype=Q_DTYPE)
+            grown[:row] = self.q_values
+            self.q_values = grown
+        self.q_index[state] = row
+        return row
+
+    def _set_table(self, keys, values):
+        # keys[i] owns row i of values. Both are built first and swapped in one
+        # statement, so a reader never pairs the old index with the new values.
+        q_values = np.array(values, dtype=Q_DTYPE).reshape(-1, 4)
+        q_index = dict(zip(keys, range(len(keys))))
+        self.q_values, self.q_index = q_values, q_index
 
     def learn(self, state, action, reward):
         # Update Q-Value
-        if state not in self.q_table: self.q_table[state] = {}
-        
-        action_key = str(action) # specific piece index
-        old_q = self.q_table[state].get(action_key, 0.0)
+        row = self.q_index.get(state)
+        if row is None:
+            row = self._add_state(state)
         
         # Simplified Bellman: NewQ = OldQ + Alpha * (Reward - OldQ)
         # We omit Gamma*MaxFutureQ here for synchronous simplicity 
         # (as we don't know the next roll yet).
-        new_q = old_q + self.alpha * (reward - old_q)
-        
-        self.q_table[state][action_key] = new_q
+        # Computed at full precision, rounded to Q_DTYPE on store.
+        old_q = float(self.q_values[row, action])
+        self.q_values[row, action] = old_q + self.alpha * (reward - old_q)
+
+    def learn_batch(self, keys, actions, rewards, counts):
+        # Merge the moves recorded by play_batch, one game after another
+        for g in range(len(counts)):
+            n = counts[g]
+            for state, action, reward in zip(keys[g, :n].tolist(), actions[g, :n].tolist(), rewards[g, :n].tolist()):
+                self.learn(state, action, reward)
 
     def save_brain(self, filename):
+        # Stored as two arrays: packed state keys and their 4 per-piece Q-values
         try:
-            with open(filename, 'w') as f:
-                json.dump(self.q_table, f)
+            n = len(self.q_index)
+            keys = np.fromiter(self.q_index.keys(), dtype=np.int64, count=n) # Already in row order
+            np.savez_compressed(filename, keys=keys, values=self.q_values[:n])
             return True
         except Exception as e:
             print(e)
@@ -91,120 +307,116 @@ class QBrain:
 
     def load_brain(self, filename):
         try:
-            with open(filename, 'r') as f:
-                self.q_table = json.load(f)
+            if filename.endswith(".json"):
+                # Older models: keys look like "p1,p2,p3,p4|roll", values like {"piece_idx": q}
+                with open(filename, 'r') as f:
+                    legacy = json.load(f)
+                keys = []
+                values = np.zeros((len(legacy), 4), dtype=Q_DTYPE)
+                for row, (key, actions) in enumerate(legacy.items()):
+                    p_str, roll = key.split("|")
+                    pieces = np.array([int(p) for p in p_str.split(",")], dtype=np.int8)
+                    keys.append(self.get_state_key(pieces, int(roll)))
+                    for action, q in actions.items():
+                        values[row, int(action)] = q
+                self._set_table(keys, values)
+            else:
+                with np.load(filename) as data:
+                    self._set_table(data['keys'].tolist(), data['values'])
             return True
         except Exception as e:
             print(e)
             return False
 
 # --- Game Logic ---
+# Valid moves depend only on the mover's four positions and the roll, so they are cached
+@lru_cache(maxsize=4096)
+def _valid_moves_for(row, roll, game_over):
+    if game_over: return ()
+    return tuple(i for i, pos in enumerate(row)
+                 if (pos == -1 and roll == 6) or (pos != -1 and pos + roll <= 57))
+
 class LudoLogic:
     def __init__(self, brain):
         self.brain = brain # Shared Brain
-        self.players = [{'id': i, 'pieces': [-1]*4, 'score': 0} for i in range(4)]
+        # SoA board state: row = player, column = piece
+        self.pieces = np.full((4, 4), -1, dtype=np.int8)
+        self.scores = np.zeros(4, dtype=np.float32)
         self.turn = 0 
-        self.global_path = self._generate_path()
+        self.coord_table = COORD_TABLE
         self.last_roll = 0
         self.waiting_for_move = False 
         self.game_over = False
         self.winner = None
-
-    def _generate_path(self):
-        path = []
-        for c in range(1, 6): path.append((c, 6))
-        for r in range(5, -1, -1): path.append((6, r))
-        path.append((7, 0))
-        for r in range(6): path.append((8, r))
-        for c in range(9, 15): path.append((c, 6))
-        path.append((14, 7))
-        for c in range(14, 8, -1): path.append((c, 8))
-        for r in range(9, 15): path.append((8, r))
-        path.append((7, 14))
-        for r in range(14, 8, -1): path.append((6, r))
-        for c in range(5, -1, -1): path.append((c, 8))
-        path.append((0, 7))
-        for c in range(6): path.append((c, 7)) 
-        return path
+        self._cached_valid = None # (turn, roll, moves) until the board changes
+        self.last_move = None     # (piece_idx, new_pos, kills, done) of the latest move
 
     def get_piece_coords(self, player_idx, piece_idx):
-        pos = self.players[player_idx]['pieces'][piece_idx]
-        if pos == -1:
-            base = [(0,0), (9,0), (9,9), (0,9)][player_idx]
-            off = [(1.5,1.5), (3.5,1.5), (1.5,3.5), (3.5,3.5)][piece_idx]
-            return (base[0] + off[0], base[1] + off[1])
-        if pos < 51: return self.global_path[(player_idx * 13 + pos) % 52]
-        elif pos < 57: 
-            d = pos - 51
-            if player_idx == 0: return (1 + d, 7)
-            if player_idx == 1: return (7, 1 + d)
-            if player_idx == 2: return (13 - d, 7)
-            if player_idx == 3: return (7, 13 - d)
-        return (7, 7)
+        cx, cy = self.coord_table[player_idx, piece_idx, self.pieces[player_idx, piece_idx] + 1]
+        return (float(cx), float(cy))
 
     def get_valid_moves(self, roll):
-        if self.game_over: return []
-        valid = []
-        for i, pos in enumerate(self.players[self.turn]['pieces']):
-            if pos == -1 and roll == 6: valid.append(i)
-            elif pos != -1 and pos + roll <= 57: valid.append(i)
-        return valid
+        cached = self._cached_valid
+        if cached is not None and cached[0] == self.turn and cached[1] == roll:
+            return cached[2]
+        row = tuple(self.pieces[self.turn].tolist())
+        moves = list(_valid_moves_for(row, roll, self.game_over))
+        self._cached_valid = (self.turn, roll, moves)
+        return moves
+
+    def set_pieces(self, pieces):
+        # Overwrite the whole board (e.g. with a training snapshot)
+        self.pieces[:] = pieces
+        self._cached_valid = None
 
     def move_piece(self, piece_idx, roll, training_mode=True):
         p_id = self.turn
-        curr = self.players[p_id]['pieces'][piece_idx]
-        new_pos = 0 if curr == -1 else curr + roll
         
         # State BEFORE move (for learning)
-        prev_pieces = self.players[p_id]['pieces'].copy()
-        state_key = self.brain.get_state_key(prev_pieces, roll)
-
-        # Execute Move
-        self.players[p_id]['pieces'][piece_idx] = new_pos
-        reward = 1 + new_pos * 0.1
-        log_txt = f"Moved P{piece_idx+1} to {new_pos}"
-
-        # Kill Logic
-        if new_pos < 51:
-            my_glob = (p_id * 13 + new_pos) % 52
-            if new_pos not in [0, 8, 13, 21, 26, 34, 39, 47]: 
-                for oid in range(4):
-                    if oid == p_id: continue
-                    for opi, opos in enumerate(self.players[oid]['pieces']):
-                        if opos != -1 and opos < 51:
-                            if (oid * 13 + opos) % 52 == my_glob:
-                                self.players[oid]['pieces'][opi] = -1
-                                reward += 50
-                                log_txt += " [KILL]"
+        state_key = self.brain.get_state_key(self.pieces[p_id], roll)
+
+        # Execute Move (jitted)
+        new_pos, reward, kills, done = step_kernel(self.pieces, p_id, piece_idx, roll)
+        self._cached_valid = None
+        self.last_move = (piece_idx, new_pos, kills, done)
         
-        if new_pos == 57:
-            reward += 100
-            log_txt += " [HOME]"
-            if sum(1 for p in self.players[p_id]['pieces'] if p == 57) == 4:
-                self.game_over = True
-                self.winner = ['Red','Green','Yellow','Blue'][p_id]
-                log_txt += " [WINNER]"
+        if done:
+            self.game_over = True
+            self.winner = NAMES[p_id]
 
-        self.players[p_id]['score'] += reward
+        self.scores[p_id] += reward
         
         # LEARN: Only learn if in training mode
         if training_mode:
             self.brain.learn(state_key, piece_idx, reward)
                                          
-        return reward, log_txt
+        return reward
+
+    def describe_last_move(self):
+        # Log text is only built when someone actually shows it
+        piece_idx, new_pos, kills, done = self.last_move
+        log_txt = f"Moved P{piece_idx+1} to {new_pos}" + " [KILL]" * kills
+        if new_pos == 57:
+            log_txt += " [HOME]"
+            if done: log_txt += " [WINNER]"
+        return log_txt
 
 # --- GUI ---
 class LudoGUI(tk.Tk):
-    def __init__(self):
+    def __init__(self, seed=None):
         super().__init__()
         self.title("Ludo - Train & Play Model")
         self.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
         self.resizable(False, False)
         
-        self.brain = QBrain() # The Shared Brain
+        self.brain = QBrain(seed) # The Shared Brain (seed it for reproducible sessions)
         self.logic = LudoLogic(self.brain)
         
         self.ai_running = False
+        self.run_stop = threading.Event()  # Set to stop the current AI run; a new one per Start
+        self.games_trained = 0
+        self.brain_lock = threading.Lock() # Training worker / AI turns vs. Save/Load
+        self.batch_lock = threading.Lock() # One play_batch at a time (old run finishing vs. new run)
         self._init_ui()
         self.canvas.bind("<Button-1>", self.on_board_click)
 
@@ -239,7 +451,7 @@ class LudoGUI(tk.Tk):
 
         tk.Label(self.panel, text="Speed:", bg=COLORS['panel_bg']).pack(pady=(5,0))
         self.speed_slider = tk.Scale(self.panel, from_=0.0, to=1.0, resolution=0.05, orient=tk.HORIZONTAL, bg=COLORS['panel_bg'])
-        self.speed_slider.set(0.1) # Fast default for training
+        self.speed_slider.set(0.1) # Delay between AI turns in Human vs AI (training runs flat out)
         self.speed_slider.pack(fill=tk.X, padx=20)
 
         self.turn_lbl = tk.Label(self.panel, text="Red's Turn", font=("Arial", 12, "bold"), bg=COLORS['R'], fg="white", width=25, pady=10)
@@ -255,6 +467,7 @@ class LudoGUI(tk.Tk):
         self.log_box.tag_config("INFO", foreground="gray")
 
         self._draw_board_static()
+        self._create_piece_items()
         self._refresh_pieces()
 
     # --- Draw & Logic Helpers (Standard) ---
@@ -301,56 +514,75 @@ class LudoGUI(tk.Tk):
         for x, y in dots[num]:
             self.dice_frame.create_oval(x-3, y-3, x+3, y+3, fill="black")
 
+    def _create_piece_items(self):
+        # Canvas items are created once and only moved/shown/hidden afterwards
+        self.hl_items = [self.canvas.create_oval(0, 0, 0, 0, outline="magenta", width=3, state="hidden") for _ in range(4)]
+        self.piece_items = [[(self.canvas.create_oval(0, 0, 0, 0, fill=COLS[pid], outline="white", width=2),
+                              self.canvas.create_text(0, 0, text=str(i+1), fill="white", font=("Arial", 9, "bold")))
+                             for i in range(4)] for pid in range(4)]
+        self._last_pieces = [[None]*4 for _ in range(4)] # Last drawn (x, y) per piece
+        self._last_hl = [None]*4                         # Last drawn highlight (x, y), None = hidden
+
     def _refresh_pieces(self):
-        self.canvas.delete("piece")
-        self.canvas.delete("hl")
-        names = ["Red", "Green", "Yellow", "Blue"]
-        cols = [COLORS['R'], COLORS['G'], COLORS['Y'], COLORS['B']]
-        
         if self.logic.game_over:
             self.turn_lbl.config(text=f"WINNER: {self.logic.winner}", bg="#8E44AD")
         else:
-            self.turn_lbl.config(text=f"{names[self.logic.turn]}'s Turn", bg=cols[self.logic.turn])
+            self.turn_lbl.config(text=f"{NAMES[self.logic.turn]}'s Turn", bg=COLS[self.logic.turn])
 
-        for pid, p in enumerate(self.logic.players):
+        # Stacking offset: how many earlier pieces (in player, piece order) share this position
+        flat = self.logic.pieces.ravel()
+        same = (flat[:, None] == flat[None, :]) & (flat[None, :] != -1)
+        overlaps = np.tril(same, -1).sum(axis=1).reshape(4, 4).tolist()
+        
+        for pid in range(4):
             for i in range(4):
                 cx, cy = self.logic.get_piece_coords(pid, i)
                 x, y = cx*CELL_SIZE, cy*CELL_SIZE
-                overlap = 0
-                for opid in range(4):
-                    for opi in range(4):
-                        if (opid < pid or (opid==pid and opi < i)) and \
-                           self.logic.players[opid]['pieces'][opi] == p['pieces'][i] and \
-                           p['pieces'][i] != -1:
-                            overlap += 1
-                off = overlap * 4
+                off = overlaps[pid][i] * 4
                 
                 # Highlight if valid
-                if pid == self.logic.turn and self.logic.waiting_for_move and \
-                   i in self.logic.get_valid_moves(self.logic.last_roll):
-                    self.canvas.create_oval(x+2, y+2, x+38, y+38, outline="magenta", width=3, tags="hl")
+                if pid == self.logic.turn:
+                    hl = (x, y) if self.logic.waiting_for_move and \
+                         i in self.logic.get_valid_moves(self.logic.last_roll) else None
+                    if hl != self._last_hl[i]:
+                        if hl is None:
+                            self.canvas.itemconfigure(self.hl_items[i], state="hidden")
+                        else:
+                            self.canvas.coords(self.hl_items[i], x+2, y+2, x+38, y+38)
+                            self.canvas.itemconfigure(self.hl_items[i], state="normal")
+                        self._last_hl[i] = hl
                 
-                self.canvas.create_oval(x+5+off, y+5+off, x+35+off, y+35+off, fill=cols[pid], outline="white", width=2, tags="piece")
-                self.canvas.create_text(x+20+off, y+20+off, text=str(i+1), fill="white", font=("Arial", 9, "bold"), tags="piece")
+                # Only move pieces whose drawn spot changed since last frame
+                spot = (x+off, y+off)
+                if spot != self._last_pieces[pid][i]:
+                    oval_id, text_id = self.piece_items[pid][i]
+                    self.canvas.coords(oval_id, x+5+off, y+5+off, x+35+off, y+35+off)
+                    self.canvas.coords(text_id, x+20+off, y+20+off)
+                    self._last_pieces[pid][i] = spot
 
     def log(self, msg, tag=None):
         self.log_box.insert(tk.END, "> "+msg+"\n", tag)
+        self.log_box.delete("1.0", f"end-{LOG_MAX_LINES}l")
         self.log_box.see(tk.END)
 
     # --- BRAIN IO ---
     def save_model(self):
         # We save the SHARED QBrain
-        filename = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")])
+        filename = filedialog.asksaveasfilename(defaultextension=".npz", filetypes=[("Brain Files", "*.npz")])
         if filename:
-            if self.brain.save_brain(filename):
-                self.log(f"Model saved! Size: {len(self.brain.q_table)} states.", "INFO")
+            with self.brain_lock:
+                ok = self.brain.save_brain(filename)
+            if ok:
+                self.log(f"Model saved! Size: {len(self.brain.q_index)} states.", "INFO")
             else: self.log("Save failed.")
 
     def load_model(self):
-        filename = filedialog.askopenfilename(filetypes=[("JSON Files", "*.json")])
+        filename = filedialog.askopenfilename(filetypes=[("Brain Files", "*.npz"), ("JSON Files", "*.json")])
         if filename:
-            if self.brain.load_brain(filename):
-                self.log(f"Model Loaded! States: {len(self.brain.q_table)}", "INFO")
+            with self.brain_lock:
+                ok = self.brain.load_brain(filename)
+            if ok:
+                self.log(f"Model Loaded! States: {len(self.brain.q_index)}", "INFO")
                 self.log("AI will now use these learned moves.")
             else: self.log("Load failed.")
 
@@ -365,34 +597,69 @@ class LudoGUI(tk.Tk):
 
     def stop_ai(self):
         self.ai_running = False
+        self.run_stop.set()
 
     def start_ai_loop(self):
         if not self.ai_running:
             self.ai_running = True
-            threading.Thread(target=self._ai_loop, daemon=True).start()
+            # Each run gets its own stop event (and snapshot queue), so a worker from a
+            # previous run that is still busy finishes its batch and exits on its own.
+            stop = self.run_stop = threading.Event()
+            if self.mode_var.get() == "AI vs AI (Training)":
+                snapshots = queue.Queue(maxsize=1) # Latest training frame only
+                threading.Thread(target=self._train_loop, args=(stop, snapshots), daemon=True).start()
+                self.after(SNAPSHOT_MS, self._poll_snapshot, stop, snapshots)
+            else:
+                threading.Thread(target=self._ai_loop, args=(stop,), daemon=True).start()
+
+    def _train_loop(self, stop, snapshots):
+        # Headless worker: plays self-play batches as fast as it can and never touches Tk.
+        # The GUI only gets a copy of the board every SNAPSHOT_MS.
+        last_push = 0.0
+        while not stop.is_set():
+            with self.batch_lock:
+                boards, keys, actions, rewards, counts = play_batch(TRAIN_BATCH_GAMES, self.brain.rng.batch_seed())
+            with self.brain_lock:
+                self.brain.learn_batch(keys, actions, rewards, counts)
+            self.games_trained += TRAIN_BATCH_GAMES
+            
+            now = time.monotonic()
+            if now - last_push >= SNAPSHOT_MS / 1000:
+                last_push = now
+                # Final board of the last game in the batch; drop any frame the GUI hasn't shown yet
+                snap = (boards[-1].copy(), self.games_trained, len(self.brain.q_index))
+                try: snapshots.get_nowait()
+                except queue.Empty: pass
+                try: snapshots.put_nowait(snap)
+                except queue.Full: pass
+
+    def _poll_snapshot(self, stop, snapshots):
+        if stop.is_set(): return
+        try:
+            self._render_snapshot(*snapshots.get_nowait())
+        except queue.Empty:
+            pass
+        self.after(SNAPSHOT_MS, self._poll_snapshot, stop, snapshots)
+
+    def _render_snapshot(self, pieces, games, states):
+        self.logic.set_pieces(pieces)
+        self.log(f"[Train] {games} games, {states} states", "INFO")
+        self._refresh_pieces()
 
-    def _ai_loop(self):
-        while self.ai_running and not self.logic.game_over:
+    def _ai_loop(self, stop):
+        while not stop.is_set() and not self.logic.game_over:
             # Check who plays
             mode = self.mode_var.get()
-            is_ai_turn = False
-            
-            if mode == "AI vs AI (Training)": 
-                is_ai_turn = True
-            elif mode == "Human(Red) vs AI (Play)":
-                if self.logic.turn != 0: is_ai_turn = True # AI plays Green, Yellow, Blue
             
-            if is_ai_turn:
-                # Is training allowed?
-                # Yes if AI vs AI. No if playing against Human (Inference mode)
-                train = (mode == "AI vs AI (Training)")
-                self.play_turn_ai(training=train)
+            if mode == "Human(Red) vs AI (Play)" and self.logic.turn != 0:
+                # AI plays Green, Yellow, Blue in inference mode (no training against Human)
+                self.play_turn_ai()
                 time.sleep(float(self.speed_slider.get()))
             else:
                 time.sleep(0.5)
 
-    def play_turn_ai(self, training):
-        roll = random.randint(1, 6)
+    def play_turn_ai(self):
+        roll = self.brain.rng.roll()
         self.draw_dice(roll)
         self.logic.last_roll = roll
         valid = self.logic.get_valid_moves(roll)
@@ -401,14 +668,15 @@ class LudoGUI(tk.Tk):
             self._next_turn(roll)
             return
 
-        # Use Brain
-        action = self.brain.choose_action(self.logic.players[self.logic.turn]['pieces'], roll, valid, training=training)
+        # Use Brain (locked so a Load Model in the middle can't swap the table under us)
+        with self.brain_lock:
+            action = self.brain.choose_action(self.logic.pieces[self.logic.turn], roll, valid)
         
-        # Execute (pass training flag to update weights or not)
-        rwd, msg = self.logic.move_piece(action, roll, training_mode=training)
+        # Execute without learning (playing against a Human)
+        rwd = self.logic.move_piece(action, roll, training_mode=False)
         
         p_tag = ["R","G","Y","B"][self.logic.turn]
-        self.log(f"[{p_tag}] {msg} (Rwd:{rwd:.0f})", p_tag)
+        self.log(f"[{p_tag}] {self.logic.describe_last_move()} (Rwd:{rwd:.0f})", p_tag)
         self._refresh_pieces()
         self._next_turn(roll)
 
@@ -421,7 +689,7 @@ class LudoGUI(tk.Tk):
         
         if self.logic.game_over or self.logic.waiting_for_move: return
         
-        roll = random.randint(1, 6)
+        roll = self.brain.rng.roll()
         self.draw_dice(roll)
         self.logic.last_roll = roll
         valid = self.logic.get_valid_moves(roll)
@@ -462,5 +730,6 @@ class LudoGUI(tk.Tk):
             self.after(50, self._refresh_pieces)
 
 if __name__ == "__main__":
-    app = LudoGUI()
+    # Optional first argument: random seed, e.g. python "ludo qlearning.py" 42
+    app = LudoGUI(seed=int(sys.argv[1]) if len(sys.argv) > 1 else None)
     app.mainloop()
\ No newline at end of file